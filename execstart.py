@@ -14,6 +14,7 @@ os.environ['ROOT'] = CURRENTDIR
 
 try:
     from src.filehelp import FileHelp
+    from src.statushelp import StatusHelp
     from src.vpnhelp import VpnHelp
 
 except ImportError as e:
@@ -34,6 +35,25 @@ def main() -> None:
                 f.write(str(process.pid))
             print(f'Server start with PID: {process.pid}')
 
+            # Keep the status segment fresh while openvpn runs.
+            if os.fork() == 0:
+                exit_code = 1
+                try:
+                    # Nobody reads openvpn's output here, holding the pipes
+                    # open would block openvpn once they fill up.
+                    process.stdout.close()
+                    process.stderr.close()
+
+                    os.setsid()
+                    StatusHelp(writable=True).monitor(process.pid)
+                    exit_code = 0
+
+                except Exception as err:
+                    print(f'Status monitor error: {err}')
+
+                finally:
+                    os._exit(exit_code)
+
         else:
             print('Fail')
             sys.exit(1)
@@ -48,6 +48,7 @@ if [ ! -d "${CONFIG_DIR}" ]; then
   
   # Create the configuration file and the servers directory.
   touch "${CONFIG_DIR}/vpnmanager.conf"
+  touch "${CONFIG_DIR}/bypass.txt"
   mkdir -p "${CONFIG_DIR}/servers"
   check_errors "Failed to create configuration files"
 fi
@@ -79,6 +80,15 @@ else
   echo -e "${GREEN}[+] OpenVPN is already installed.${RESET}"
 fi
 
+# Check if ipset is installed (split tunneling); if not, install it.
+if ! command -v ipset &> /dev/null; then
+  echo -e "${YELLOW}[+] ipset is not installed. Installing...${RESET}"
+  apt install -y ipset &> /dev/null
+  check_errors "Failed to install ipset"
+else
+  echo -e "${GREEN}[+] ipset is already installed.${RESET}"
+fi
+
 # Reload the systemd daemon.
 echo -e "${GREEN}[+] Reloading systemd daemon.${RESET}"
 systemctl daemon-reload
@@ -0,0 +1,222 @@
+import hashlib
+import re
+import subprocess
+import time
+
+from .filehelp import CATALOG_FILE, FileHelp
+
+
+class CipherHelp:
+    """
+    Class responsible for benchmarking data-channel ciphers on this host
+    and offering openvpn only the fastest one the server supports.
+    """
+
+    # AEAD ciphers openvpn can negotiate, in openvpn's naming.
+    CANDIDATES = ['AES-256-GCM', 'AES-128-GCM', 'CHACHA20-POLY1305']
+
+    # Roughly one full tunnel packet, so the numbers match real traffic.
+    BLOCK_SIZE = 1440
+
+    @staticmethod
+    def _get_cpu_key() -> str:
+        """
+        Builds a short key from the CPU feature flags, so results are shared
+        between hosts with the same capabilities and redone on new hardware.
+        """
+        flags = []
+        try:
+            with open('/proc/cpuinfo') as file:
+                for line in file:
+                    # 'flags' on x86, 'Features' on ARM.
+                    if line.startswith(('flags', 'Features')):
+                        flags = line.split(':', 1)[1].split()
+                        break
+
+        except OSError as err:
+            print(f'Error reading CPU flags: {err}')
+
+        return hashlib.sha256(' '.join(sorted(flags)).encode()).hexdigest()[:16]
+
+    @staticmethod
+    def _measure(cipher: str, seconds: int = 1) -> float | None:
+        """
+        Measures the throughput of a cipher using OpenSSL, the library openvpn
+        uses for its data channel.
+
+        Args:
+
+            cipher (str): Cipher name in openvpn's naming e.g AES-256-GCM
+
+            seconds (int): Duration of the benchmark.
+
+        Return:
+
+            Throughput in bytes per second, or None if the cipher is unavailable.
+        """
+        try:
+            result = subprocess.run(
+                [
+                    'openssl',
+                    'speed',
+                    '-evp',
+                    cipher.lower(),
+                    '-bytes',
+                    str(CipherHelp.BLOCK_SIZE),
+                    '-seconds',
+                    str(seconds),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+
+            # Last line looks like: 'AES-256-GCM    4563456.12k'
+            lines = [line for line in result.stdout.splitlines() if line.strip()]
+            value = lines[-1].split()[-1]
+            return float(value.rstrip('k')) * 1000
+
+        except (subprocess.CalledProcessError, FileNotFoundError) as err:
+            print(f'Unable to benchmark {cipher}: {err}')
+        except (IndexError, ValueError):
+            print(f'Unexpected benchmark output for {cipher}.')
+
+        return None
+
+    @staticmethod
+    def benchmark() -> dict:
+        """
+        Times every candidate cipher and caches the result for this CPU.
+
+        Return:
+
+            Dict with the throughput per cipher and the preferred order.
+        """
+        results = {}
+        for cipher in CipherHelp.CANDIDATES:
+            speed = CipherHelp._measure(cipher)
+            if speed is not None:
+                results[cipher] = speed
+                print(f'{cipher}: {speed / 1e6:.1f} MB/s')
+
+        entry = {
+            'order': sorted(results, key=results.get, reverse=True),
+            'results': results,
+            'benchmarked_at': int(time.time()),
+        }
+
+        # Cached even when empty (e.g no openssl), so it is not retried on
+        # every connect.
+        catalog = FileHelp.read_json(CATALOG_FILE)
+        catalog.setdefault('ciphers', {})[CipherHelp._get_cpu_key()] = entry
+        FileHelp.write_json(CATALOG_FILE, catalog)
+
+        return entry
+
+    @staticmethod
+    def preferred_order() -> list:
+        """
+        Returns the ciphers ordered from fastest to slowest on this host,
+        benchmarking first if nothing is cached for this CPU.
+        """
+        catalog = FileHelp.read_json(CATALOG_FILE)
+        entry = catalog.get('ciphers', {}).get(CipherHelp._get_cpu_key())
+
+        if not entry:
+            print('No cipher benchmark for this CPU, running it now.')
+            entry = CipherHelp.benchmark()
+
+        return entry.get('order', [])
+
+    @staticmethod
+    def _get_openvpn_version() -> tuple:
+        """
+        Reads the installed openvpn version.
+
+        Return:
+
+            A (major, minor) tuple, or (0, 0) if it could not be determined.
+        """
+        try:
+            result = subprocess.run(
+                ['openvpn', '--version'], capture_output=True, text=True
+            )
+            match = re.search(r'OpenVPN (\d+)\.(\d+)', result.stdout)
+            if match:
+                return int(match.group(1)), int(match.group(2))
+
+        except Exception as err:
+            print(f'Unable to get openvpn version: {err}')
+
+        return 0, 0
+
+    @staticmethod
+    def _get_config_ciphers(config_file: str) -> tuple[list, str | None]:
+        """
+        Reads the ciphers declared by the provider in an openvpn config.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+        Return:
+
+            A (data_ciphers, cipher) tuple, empty list and None when absent.
+        """
+        data_ciphers = []
+        cipher = None
+        try:
+            with open(config_file) as file:
+                for line in file:
+                    parts = line.split()
+                    if len(parts) < 2:
+                        continue
+
+                    if parts[0] in ('data-ciphers', 'ncp-ciphers'):
+                        data_ciphers += parts[1].upper().split(':')
+                    elif parts[0] == 'cipher':
+                        cipher = parts[1].upper()
+
+        except OSError as err:
+            print(f'Error reading config {config_file}: {err}')
+
+        return data_ciphers, cipher
+
+    @staticmethod
+    def openvpn_args(config_file: str) -> list:
+        """
+        Builds the data-ciphers options offering only the fastest cipher.
+
+        During negotiation the server walks its own list and picks the first
+        cipher the client also offers, so the client order is ignored and the
+        only way to steer the choice is to offer a single cipher. That is
+        only safe for ciphers the provider lists in its own data-ciphers, so
+        configs without that list are left untouched; the legacy cipher is
+        kept as the fallback for servers without negotiation.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+        Return:
+
+            List of command line options, empty if the config has no
+            data-ciphers, no benchmark is available or openvpn is older than
+            2.5, which lacks these options.
+        """
+        if CipherHelp._get_openvpn_version() < (2, 5):
+            return []
+
+        data_ciphers, cipher = CipherHelp._get_config_ciphers(config_file)
+        if not data_ciphers:
+            return []
+
+        order = [name for name in CipherHelp.preferred_order() if name in data_ciphers]
+        if not order:
+            return []
+
+        args = ['--data-ciphers', order[0]]
+        if cipher:
+            args += ['--data-ciphers-fallback', cipher]
+
+        return args
@@ -1,8 +1,12 @@
+import json
 import os
 import random
 import subprocess
 
 
+CATALOG_FILE = '/etc/vpnmanager/catalog.json'
+
+
 class FileHelp:
     """
     A utility class for managing file attributes and content.
@@ -192,3 +196,64 @@ class FileHelp:
             print(f'Unexpected error: {e}')
 
         return None
+
+    @staticmethod
+    def read_json(path: str) -> dict:
+        """
+        Reads a JSON object from a file.
+
+        Args:
+
+            path (str): Path to the file.
+
+        Return:
+
+            The decoded object, or an empty dict if the file is missing or invalid.
+        """
+        try:
+            if not os.path.exists(path):
+                return {}
+
+            with open(path) as file:
+                data = json.load(file)
+
+            return data if isinstance(data, dict) else {}
+
+        except json.JSONDecodeError:
+            print(f"Error: '{path}' is not valid JSON, ignoring it.")
+        except Exception as e:
+            print(f'Unexpected error: {e}')
+
+        return {}
+
+    @staticmethod
+    def write_json(path: str, data: dict) -> bool:
+        """
+        Writes a JSON object to a file, replacing it atomically.
+
+        Args:
+
+            path (str): Path to the file.
+            data (dict): Object to serialize.
+
+        Return:
+
+            True if the write operation was successful, False otherwise.
+        """
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(data, file, indent=4, sort_keys=True)
+
+            os.replace(tmp_path, path)
+            return True
+
+        except OSError:
+            print(
+                f"Error: Unable to write to '{path}'."
+                + ' Check permissions and available space.'
+            )
+        except Exception as e:
+            print(f'Unexpected error: {e}')
+
+        return False
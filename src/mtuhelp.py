@@ -0,0 +1,441 @@
+import os
+import socket
+import subprocess
+import time
+
+from .filehelp import CATALOG_FILE, FileHelp
+
+
+class MtuHelp:
+    """
+    Class responsible for path-MTU discovery and tun-mtu/mssfix tuning.
+    Probed values are cached per server in the catalog and handed to
+    openvpn on the next connect.
+    """
+
+    # IPv4 minimum and Ethernet maximum, bounds for the binary search.
+    MIN_MTU = 576
+    MAX_MTU = 1500
+
+    # IPv4 + ICMP echo headers added by ping on top of the payload size.
+    ICMP_OVERHEAD = 28
+
+    # Outer IPv4 + transport headers per protocol.
+    TRANSPORT_OVERHEAD = {'udp': 28, 'tcp': 42}
+
+    # Openvpn data channel framing shared by every cipher: opcode/peer-id,
+    # packet id and one byte for compression framing.
+    FRAMING_OVERHEAD = 9
+
+    # AEAD ciphers (GCM, ChaCha20-Poly1305) only add their 16 byte tag.
+    AEAD_TAG = 16
+
+    # HMAC sizes used by CBC ciphers, openvpn's default auth is SHA1.
+    HMAC_SIZES = {
+        'MD5': 16,
+        'SHA1': 20,
+        'SHA224': 28,
+        'SHA256': 32,
+        'SHA384': 48,
+        'SHA512': 64,
+        'NONE': 0,
+    }
+
+    # Ciphers with 8 byte blocks, every other CBC cipher uses 16.
+    SMALL_BLOCK_CIPHERS = ('BF-', 'DES-', 'CAST5-')
+
+    # Successful probes are refreshed weekly, failed ones retried daily.
+    PROBE_TTL = 7 * 24 * 3600
+    FAILED_TTL = 24 * 3600
+
+    # Echoes per probed size, any reply counts as a pass.
+    PROBE_COUNT = 3
+
+    @staticmethod
+    def _get_remote(config_file: str) -> tuple[str, str] | None:
+        """
+        Reads the first remote host and its protocol from an openvpn config.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+        Return:
+
+            A (host, proto) tuple, or None if no remote is declared.
+        """
+        try:
+            host = None
+            proto = 'udp'
+
+            with open(config_file) as file:
+                for line in file:
+                    parts = line.split()
+                    if not parts or parts[0].startswith(('#', ';')):
+                        continue
+
+                    if parts[0] == 'proto' and len(parts) > 1:
+                        proto = parts[1]
+                    elif parts[0] == 'remote' and len(parts) > 1 and host is None:
+                        host = parts[1]
+                        if len(parts) > 3:
+                            proto = parts[3]
+
+            if host is None:
+                return None
+
+            return host, 'tcp' if proto.startswith('tcp') else 'udp'
+
+        except OSError as err:
+            print(f'Error reading config {config_file}: {err}')
+            return None
+
+    @staticmethod
+    def _probe(host: str, mtu: int, interface: str | None = None) -> bool:
+        """
+        Sends a few pings with the DF bit set and the given packet size.
+        ping exits with success if any echo comes back, so a single lost
+        packet does not lower the result.
+
+        Args:
+
+            host (str): Destination host.
+
+            mtu (int): Total IP packet size to probe.
+
+            interface (str): Optional interface to send the probe through.
+        """
+        command = ['ping', '-c', str(MtuHelp.PROBE_COUNT), '-i', '0.2']
+        command += ['-W', '1', '-M', 'do']
+        command += ['-s', str(mtu - MtuHelp.ICMP_OVERHEAD)]
+        if interface:
+            command += ['-I', interface]
+        command.append(host)
+
+        try:
+            result = subprocess.run(
+                command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return result.returncode == 0
+
+        except Exception:
+            return False
+
+    @staticmethod
+    def path_mtu(
+        host: str,
+        interface: str | None = None,
+        low: int = MIN_MTU,
+        high: int = MAX_MTU,
+    ) -> int | None:
+        """
+        Finds the largest packet that reaches the host without fragmentation,
+        using a binary search over DF-bit pings.
+
+        Args:
+
+            host (str): Destination host.
+
+            interface (str): Optional interface to send the probes through.
+
+            low (int): Smallest packet size to consider.
+
+            high (int): Largest packet size to consider.
+
+        Return:
+
+            The path MTU, or None if not even the smallest probe got through.
+        """
+        if not MtuHelp._probe(host, low, interface):
+            return None
+
+        while low < high:
+            middle = (low + high + 1) // 2
+            if MtuHelp._probe(host, middle, interface):
+                low = middle
+            else:
+                high = middle - 1
+
+        return low
+
+    @staticmethod
+    def _allow_icmp(address: str, allow: bool) -> bool:
+        """
+        Adds or removes a narrow kill switch exception for the DF probes,
+        so discovery can run while all other traffic stays blocked.
+
+        Args:
+
+            address (str): Server IP address.
+
+            allow (bool): True to insert the rule, False to delete it.
+        """
+        try:
+            subprocess.run(
+                [
+                    'iptables',
+                    '-I' if allow else '-D',
+                    'OUTPUT',
+                    '-p',
+                    'icmp',
+                    '--icmp-type',
+                    'echo-request',
+                    '-d',
+                    address,
+                    '-j',
+                    'ACCEPT',
+                ],
+                check=True,
+            )
+            return True
+
+        except subprocess.CalledProcessError as e:
+            print(f'Error updating ICMP rule for {address}: {e}')
+            return False
+
+    @staticmethod
+    def _get_interface_mtu(interface: str) -> int | None:
+        """
+        Reads the configured MTU of an interface.
+
+        Args:
+
+            interface (str): Name from Inteface e.g tun0
+        """
+        try:
+            with open(f'/sys/class/net/{interface}/mtu') as file:
+                return int(file.read())
+
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _get_overhead(config_file: str) -> int:
+        """
+        Computes the openvpn data channel overhead for the ciphers a config
+        may end up using. The largest one is kept, since the server decides
+        which cipher is negotiated.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+        Return:
+
+            Overhead in bytes, without the outer IP/transport headers.
+        """
+        # Before 2.6 openvpn defaults to BF-CBC with SHA1.
+        ciphers = []
+        auth = 'SHA1'
+        try:
+            with open(config_file) as file:
+                for line in file:
+                    parts = line.split()
+                    if len(parts) < 2:
+                        continue
+
+                    if parts[0] in ('data-ciphers', 'ncp-ciphers'):
+                        ciphers += parts[1].upper().split(':')
+                    elif parts[0] == 'cipher':
+                        ciphers.append(parts[1].upper())
+                    elif parts[0] == 'auth':
+                        auth = parts[1].upper().replace('-', '')
+
+        except OSError as err:
+            print(f'Error reading config {config_file}: {err}')
+
+        overheads = []
+        for cipher in ciphers or ['BF-CBC']:
+            if cipher.endswith('GCM') or cipher.startswith('CHACHA20'):
+                overheads.append(MtuHelp.AEAD_TAG)
+                continue
+
+            # CBC: HMAC, IV and up to one block of padding.
+            block = 8 if cipher.startswith(MtuHelp.SMALL_BLOCK_CIPHERS) else 16
+            hmac = MtuHelp.HMAC_SIZES.get(auth, max(MtuHelp.HMAC_SIZES.values()))
+            overheads.append(hmac + 2 * block)
+
+        return MtuHelp.FRAMING_OVERHEAD + max(overheads)
+
+    @staticmethod
+    def derive(
+        path_mtu: int,
+        tunnel_mtu: int | None = None,
+        proto: str = 'udp',
+        openvpn_overhead: int = 45,
+    ) -> dict:
+        """
+        Derives tun-mtu and mssfix from the measured MTUs.
+
+        Args:
+
+            path_mtu (int): Path MTU between this host and the server.
+
+            tunnel_mtu (int): Path MTU measured through the tunnel, if any.
+
+            proto (str): Transport protocol used to reach the server.
+
+            openvpn_overhead (int): Data channel overhead from _get_overhead(),
+            the default matches BF-CBC/SHA1.
+
+        Return:
+
+            Dict with the tun_mtu and mssfix values.
+        """
+        overhead = MtuHelp.TRANSPORT_OVERHEAD[proto] + openvpn_overhead
+        tun_mtu = path_mtu - overhead
+
+        if tunnel_mtu is not None:
+            tun_mtu = min(tun_mtu, tunnel_mtu)
+
+        # mssfix is the largest openvpn packet (without IP/transport headers)
+        # that TCP sessions inside the tunnel are clamped to.
+        return {'tun_mtu': tun_mtu, 'mssfix': tun_mtu + openvpn_overhead}
+
+    @staticmethod
+    def discover(
+        config_file: str, tun_device: str = 'tun0', target: str = '1.1.1.1'
+    ) -> dict | None:
+        """
+        Probes the path to the server and through the established tunnel,
+        then caches the derived values in the catalog. Meant to run with the
+        kill switch enabled, only the echo requests to the server are let
+        through. Servers that ignore the probes are cached as failed so they
+        are not probed again on every connect, see needs_probe().
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+            tun_device (str): Tunnel interface brought up by openvpn.
+
+            target (str): Host reached through the tunnel for the inner probe.
+
+        Return:
+
+            The cached entry, or None if the server could not be probed.
+        """
+        remote = MtuHelp._get_remote(config_file)
+        if remote is None:
+            print(f'No remote found in {config_file}, skipping MTU discovery.')
+            return None
+
+        host, proto = remote
+        try:
+            address = socket.gethostbyname(host)
+        except OSError as err:
+            print(f'Unable to resolve {host}: {err}')
+            return None
+
+        if not MtuHelp._allow_icmp(address, True):
+            return None
+
+        try:
+            path_mtu = MtuHelp.path_mtu(address)
+        finally:
+            MtuHelp._allow_icmp(address, False)
+
+        if path_mtu is None:
+            print(f'Server {host} does not answer DF probes, keeping defaults.')
+            MtuHelp.save(config_file, {'failed': True, 'probed_at': int(time.time())})
+            return None
+
+        tunnel_mtu = MtuHelp.path_mtu(
+            target,
+            interface=tun_device,
+            high=MtuHelp._get_interface_mtu(tun_device) or MtuHelp.MAX_MTU,
+        )
+
+        overhead = MtuHelp._get_overhead(config_file)
+        entry = MtuHelp.derive(path_mtu, tunnel_mtu, proto, overhead)
+        entry.update(
+            {
+                'remote': host,
+                'overhead': overhead,
+                'proto': proto,
+                'path_mtu': path_mtu,
+                'tunnel_mtu': tunnel_mtu,
+                'probed_at': int(time.time()),
+            }
+        )
+
+        MtuHelp.save(config_file, entry)
+        print(
+            f'MTU for {host}: path {path_mtu}, tunnel {tunnel_mtu}'
+            + f' -> tun-mtu {entry["tun_mtu"]}, mssfix {entry["mssfix"]}'
+        )
+        return entry
+
+    @staticmethod
+    def load(config_file: str) -> dict | None:
+        """
+        Returns the cached MTU entry for a server.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+        """
+        catalog = FileHelp.read_json(CATALOG_FILE)
+        servers = catalog.get('servers', {})
+        return servers.get(os.path.basename(config_file), {}).get('mtu')
+
+    @staticmethod
+    def needs_probe(config_file: str) -> bool:
+        """
+        Tells whether a server has no cached entry or its entry expired.
+        Failed probes expire sooner, a single bad run does not disable
+        tuning for good.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+        """
+        entry = MtuHelp.load(config_file)
+        if not entry:
+            return True
+
+        ttl = MtuHelp.FAILED_TTL if entry.get('failed') else MtuHelp.PROBE_TTL
+        return time.time() - entry.get('probed_at', 0) > ttl
+
+    @staticmethod
+    def save(config_file: str, entry: dict) -> bool:
+        """
+        Stores the MTU entry for a server in the catalog.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+            entry (dict): Values returned by derive().
+        """
+        catalog = FileHelp.read_json(CATALOG_FILE)
+        server = catalog.setdefault('servers', {}).setdefault(
+            os.path.basename(config_file), {}
+        )
+        server['mtu'] = entry
+        return FileHelp.write_json(CATALOG_FILE, catalog)
+
+    @staticmethod
+    def openvpn_args(config_file: str) -> list:
+        """
+        Builds the openvpn options applying the cached values for a server.
+
+        Args:
+
+            config_file (str): File with the certificate and server settings.
+
+        Return:
+
+            List of command line options, empty if nothing is cached yet.
+        """
+        entry = MtuHelp.load(config_file)
+        if not entry or entry.get('failed'):
+            return []
+
+        args = ['--tun-mtu', str(entry['tun_mtu'])]
+
+        # TCP segments are already sized by the outer connection.
+        if entry.get('proto', 'udp') == 'udp':
+            args += ['--mssfix', str(entry['mssfix'])]
+
+        return args
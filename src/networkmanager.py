@@ -225,9 +225,14 @@ class NetworkManager:
         return list(set(dns_servers))
 
     @staticmethod
-    def enable_kill_switch():
+    def enable_kill_switch(bypass_set: str | None = None):
         """
         Enable kill switch with iptables firewall
+
+        Args:
+
+            bypass_set (str): Optional ipset whose destinations are allowed
+            outside the tunnel (split tunneling).
         """
         try:
             # backup current iptables config.
@@ -261,6 +266,23 @@ class NetworkManager:
                 ['iptables', '-A', 'OUTPUT', '-o', 'tun0', '-j', 'ACCEPT'], check=True
             )
 
+            if bypass_set:
+                subprocess.run(
+                    [
+                        'iptables',
+                        '-A',
+                        'OUTPUT',
+                        '-m',
+                        'set',
+                        '--match-set',
+                        bypass_set,
+                        'dst',
+                        '-j',
+                        'ACCEPT',
+                    ],
+                    check=True,
+                )
+
             subprocess.run(['iptables', '-P', 'OUTPUT', 'DROP'], check=True)
 
             print('Kill switch enable.')
@@ -0,0 +1,337 @@
+import ipaddress
+import os
+import subprocess
+
+
+BYPASS_FILE = '/etc/vpnmanager/bypass.txt'
+
+
+class SplitHelp:
+    """
+    Class responsible for split tunneling. Networks listed in the bypass file
+    are routed through the physical gateway instead of the tunnel and allowed
+    by the kill switch through a single ipset match.
+    """
+
+    IPSET_NAME = 'vpnmanager-bypass'
+
+    # Routing protocol id tagging our routes, so they can be flushed at once.
+    ROUTE_PROTO = '199'
+
+    @staticmethod
+    def _read_bypass_list(path: str = BYPASS_FILE) -> list:
+        """
+        Reads the CIDR bypass list, one network per line, '#' for comments.
+
+        Args:
+
+            path (str): Path to the bypass file.
+        """
+        networks = []
+        if not os.path.exists(path):
+            return networks
+
+        try:
+            with open(path) as file:
+                for number, line in enumerate(file, 1):
+                    entry = line.split('#', 1)[0].strip()
+                    if not entry:
+                        continue
+
+                    try:
+                        networks.append(ipaddress.ip_network(entry, strict=False))
+                    except ValueError:
+                        print(f'Ignoring invalid network on line {number}: {entry}')
+
+        except (OSError, ValueError) as err:
+            print(f"Error reading bypass list '{path}': {err}")
+            return []
+
+        return networks
+
+    @staticmethod
+    def collapse(networks: list) -> list:
+        """
+        Collapses networks into the minimal prefix set with a binary trie.
+        Prefixes covered by a shorter one are dropped on insertion and sibling
+        prefixes that fill their parent are merged bottom-up.
+
+        Args:
+
+            networks (list): ipaddress networks, IPv4 and IPv6 may be mixed.
+
+        Return:
+
+            Sorted list of collapsed networks.
+        """
+        collapsed = []
+
+        for version, bits, network_class in (
+            (4, 32, ipaddress.IPv4Network),
+            (6, 128, ipaddress.IPv6Network),
+        ):
+            # Each node is [zero_child, one_child, is_prefix].
+            root = [None, None, False]
+
+            for network in networks:
+                if network.version != version:
+                    continue
+
+                node = root
+                address = int(network.network_address)
+                for depth in range(network.prefixlen):
+                    if node[2]:
+                        break
+
+                    bit = (address >> (bits - 1 - depth)) & 1
+                    if node[bit] is None:
+                        node[bit] = [None, None, False]
+                    node = node[bit]
+
+                else:
+                    node[0] = node[1] = None
+                    node[2] = True
+
+            def merge(node: list) -> bool:
+                if node[2]:
+                    return True
+
+                full = [child is not None and merge(child) for child in node[:2]]
+                if all(full):
+                    node[0] = node[1] = None
+                    node[2] = True
+
+                return node[2]
+
+            def emit(node: list, address: int, depth: int) -> None:
+                if node[2]:
+                    collapsed.append(network_class((address << (bits - depth), depth)))
+                    return
+
+                for bit in (0, 1):
+                    if node[bit] is not None:
+                        emit(node[bit], (address << 1) | bit, depth + 1)
+
+            merge(root)
+            emit(root, 0, 0)
+
+        return collapsed
+
+    @staticmethod
+    def _get_default_route(version: int) -> tuple[str, str] | None:
+        """
+        Finds the physical default gateway for an address family.
+
+        Args:
+
+            version (int): IP version, 4 or 6.
+
+        Return:
+
+            A (gateway, device) tuple, or None if there is no default route.
+        """
+        try:
+            result = subprocess.run(
+                ['ip', f'-{version}', 'route', 'show', 'default'],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for line in result.stdout.split('\n'):
+                parts = line.split()
+                if 'via' in parts and 'dev' in parts:
+                    device = parts[parts.index('dev') + 1]
+                    if not device.startswith('tun'):
+                        return parts[parts.index('via') + 1], device
+
+        except subprocess.CalledProcessError as e:
+            print(f'Error getting default route: {e}')
+
+        return None
+
+    @staticmethod
+    def _get_existing_routes(version: int) -> list:
+        """
+        Lists the networks the main table already routes outside the tunnel,
+        e.g the connected LAN, leaving out the default route, tun routes and
+        our own bypass routes.
+
+        Args:
+
+            version (int): IP version, 4 or 6.
+        """
+        routes = []
+        try:
+            result = subprocess.run(
+                ['ip', f'-{version}', 'route', 'show', 'table', 'main'],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for line in result.stdout.split('\n'):
+                parts = line.split()
+                if not parts or parts[0] == 'default':
+                    continue
+
+                if 'dev' in parts and parts[parts.index('dev') + 1].startswith('tun'):
+                    continue
+
+                if 'proto' in parts and (
+                    parts[parts.index('proto') + 1] == SplitHelp.ROUTE_PROTO
+                ):
+                    continue
+
+                try:
+                    routes.append(ipaddress.ip_network(parts[0], strict=False))
+                except ValueError:
+                    continue
+
+        except subprocess.CalledProcessError as e:
+            print(f'Error listing routes: {e}')
+
+        return routes
+
+    @staticmethod
+    def _install_routes(networks: list, version: int) -> bool:
+        """
+        Installs the bypass routes for one address family in a single
+        'ip -batch' call. Networks the main table already routes outside the
+        tunnel are skipped: 'route replace' would overwrite e.g the connected
+        LAN route and the flush on stop would then delete it.
+
+        Args:
+
+            networks (list): Collapsed networks to route around the tunnel.
+
+            version (int): IP version, 4 or 6.
+        """
+        networks = [network for network in networks if network.version == version]
+        if not networks:
+            return True
+
+        route = SplitHelp._get_default_route(version)
+        if route is None:
+            print(f'No IPv{version} default gateway, skipping its bypass routes.')
+            return False
+
+        existing = SplitHelp._get_existing_routes(version)
+        remaining = [
+            network
+            for network in networks
+            if not any(network.subnet_of(known) for known in existing)
+        ]
+        if len(remaining) < len(networks):
+            skipped = len(networks) - len(remaining)
+            print(f'Skipping {skipped} bypass networks already routed locally.')
+            networks = remaining
+
+        if not networks:
+            return True
+
+        gateway, device = route
+        batch = ''.join(
+            f'route replace {network} via {gateway} dev {device}'
+            + f' proto {SplitHelp.ROUTE_PROTO}\n'
+            for network in networks
+        )
+
+        try:
+            subprocess.run(
+                ['ip', f'-{version}', '-force', '-batch', '-'],
+                input=batch,
+                text=True,
+                check=True,
+            )
+            return True
+
+        except subprocess.CalledProcessError as e:
+            print(f'Error installing bypass routes: {e}')
+            return False
+
+    @staticmethod
+    def _install_ipset(networks: list) -> bool:
+        """
+        Loads the IPv4 bypass networks into a hash:net ipset in a single
+        'ipset restore' call, so the kill switch matches them in constant time.
+
+        Args:
+
+            networks (list): Collapsed networks to allow.
+        """
+        networks = [network for network in networks if network.version == 4]
+        name = SplitHelp.IPSET_NAME
+
+        lines = [
+            f'create {name} hash:net family inet maxelem {max(65536, len(networks))}',
+            f'flush {name}',
+        ]
+        lines += [f'add {name} {network}' for network in networks]
+
+        try:
+            subprocess.run(
+                ['ipset', 'restore', '-exist'],
+                input='\n'.join(lines) + '\n',
+                text=True,
+                check=True,
+            )
+            return True
+
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f'Error loading ipset {name}: {e}')
+            return False
+
+    @staticmethod
+    def apply(path: str = BYPASS_FILE) -> bool:
+        """
+        Collapses the bypass list, installs its routes and loads the ipset.
+
+        Args:
+
+            path (str): Path to the bypass file.
+
+        Return:
+
+            True if the ipset is ready to be used by the kill switch.
+        """
+        networks = SplitHelp._read_bypass_list(path)
+        if not networks:
+            return False
+
+        collapsed = []
+        for network in SplitHelp.collapse(networks):
+            # A /0 would replace the default route and hash:net rejects it,
+            # its two halves cover the same space.
+            if network.prefixlen == 0:
+                collapsed += network.subnets()
+            else:
+                collapsed.append(network)
+
+        print(f'Split tunnel: {len(networks)} networks collapsed to {len(collapsed)}.')
+
+        SplitHelp._install_routes(collapsed, 4)
+        SplitHelp._install_routes(collapsed, 6)
+
+        return SplitHelp._install_ipset(collapsed)
+
+    @staticmethod
+    def remove() -> None:
+        """
+        Flushes the bypass routes and destroys the ipset. The kill switch must
+        be disabled first, iptables keeps the set busy while it is referenced.
+        """
+        for version in (4, 6):
+            subprocess.run(
+                ['ip', f'-{version}', 'route', 'flush', 'proto', SplitHelp.ROUTE_PROTO],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+        try:
+            subprocess.run(
+                ['ipset', 'destroy', SplitHelp.IPSET_NAME],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,325 @@
+import fcntl
+import mmap
+import os
+import re
+import struct
+import subprocess
+import time
+
+
+STATUS_FILE = '/run/vpnmanager.status'
+
+
+class StatusHelp:
+    """
+    Class responsible for the live status segment, a fixed-layout binary
+    record in a memory-mapped file. The manager writes it under a sequence
+    lock so any number of readers can sample it consistently without
+    forking tools or making syscalls after the initial mmap.
+
+    Layout (little endian, 144 bytes):
+
+        0    seq           uint64   odd while a write is in progress
+        8    magic         4s       b'VPNM'
+        12   version       uint16
+        14   state         uint16   index into STATES
+        16   pid           uint32   openvpn process
+        20   attempts      uint32   connection attempts of the last start
+        24   failures      uint32   failed attempts of the last start
+        28   reserved      uint32
+        32   connected_at  float64  unix timestamp, 0 if not connected
+        40   latency_ms    float64  last probe through the tunnel, -1 if lost
+                                    or not probed yet
+        48   rx_bytes      uint64   tun device counters, 0 until connected
+        56   tx_bytes      uint64
+        64   tun           16s      tun device name
+        80   server        64s      active server config
+    """
+
+    MAGIC = b'VPNM'
+    VERSION = 1
+    STATES = ['stopped', 'connecting', 'connected', 'failed']
+
+    SEQ_FORMAT = struct.Struct('<Q')
+    RECORD_FORMAT = struct.Struct('<4sHHIIIIddQQ16s64s')
+    SIZE = SEQ_FORMAT.size + RECORD_FORMAT.size
+
+    FIELDS = [
+        'state',
+        'pid',
+        'attempts',
+        'failures',
+        'connected_at',
+        'latency_ms',
+        'rx_bytes',
+        'tx_bytes',
+        'tun',
+        'server',
+    ]
+
+    # Published with the stopped and connecting states, so readers never
+    # mistake stale or unprobed metrics for live ones.
+    IDLE_METRICS = {'latency_ms': -1.0, 'rx_bytes': 0, 'tx_bytes': 0}
+
+    # Reader gives up after this many torn samples in a row.
+    MAX_RETRIES = 1000
+
+    def __init__(self, path: str = STATUS_FILE, writable: bool = False):
+        """
+        Maps the status file, creating it when opened for writing.
+
+        Args:
+
+            path (str): Path to the status file.
+
+            writable (bool): Open as the writer instead of a reader.
+        """
+        self.path = path
+        self.writable = writable
+        self.status_map = None
+        self.lock_fd = None
+        self.record = dict.fromkeys(self.FIELDS, 0)
+        self.record.update({'state': 'stopped', 'tun': '', 'server': ''})
+        self.record.update(self.IDLE_METRICS)
+
+        try:
+            if writable:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                if os.fstat(fd).st_size != self.SIZE:
+                    os.ftruncate(fd, self.SIZE)
+                access = mmap.ACCESS_WRITE
+            else:
+                fd = os.open(path, os.O_RDONLY)
+                access = mmap.ACCESS_READ
+
+            try:
+                self.status_map = mmap.mmap(fd, self.SIZE, access=access)
+            finally:
+                # Writers keep the descriptor to serialize updates with flock.
+                if writable:
+                    self.lock_fd = fd
+                else:
+                    os.close(fd)
+
+        except (OSError, ValueError) as err:
+            print(f'Error mapping status file {path}: {err}')
+            self.status_map = None
+
+    @staticmethod
+    def _encode(text: str, size: int) -> bytes:
+        """
+        Encodes text to UTF-8, truncated to size bytes on a character boundary.
+
+        Args:
+
+            text (str): Text to encode.
+
+            size (int): Maximum length in bytes.
+        """
+        return text.encode()[:size].decode('utf-8', 'ignore').encode()
+
+    def _unpack(self) -> dict | None:
+        """
+        Decodes the record currently in the map, without consistency checks.
+
+        Return:
+
+            Dict with the FIELDS values, or None if the record is invalid.
+        """
+        values = self.RECORD_FORMAT.unpack_from(self.status_map, self.SEQ_FORMAT.size)
+        if values[0] != self.MAGIC or values[1] != self.VERSION:
+            return None
+
+        if values[2] >= len(self.STATES):
+            return None
+
+        record = dict(zip(self.FIELDS, values[2:6] + values[7:]))
+        record['state'] = self.STATES[record['state']]
+        record['tun'] = record['tun'].rstrip(b'\0').decode(errors='replace')
+        record['server'] = record['server'].rstrip(b'\0').decode(errors='replace')
+        return record
+
+    def update(self, if_pid: int | None = None, **fields) -> bool:
+        """
+        Publishes new values for the given fields. Several processes write
+        the segment (execstart, the monitor, execstop), so updates hold an
+        exclusive flock and are merged into the record currently published
+        instead of a per-process copy.
+
+        Args:
+
+            if_pid (int): Only write if the published pid still matches,
+            so a stale monitor does not overwrite a newer connection.
+
+            fields: Any of FIELDS, e.g state='connected', pid=1234.
+
+        Return:
+
+            True if the record was written.
+        """
+        if not self.writable or self.status_map is None:
+            self.record.update(fields)
+            return False
+
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        try:
+            current = self._unpack()
+            if current:
+                self.record.update(current)
+
+            if if_pid is not None and self.record['pid'] != if_pid:
+                return False
+
+            self.record.update(fields)
+            record = self.record
+            body = self.RECORD_FORMAT.pack(
+                self.MAGIC,
+                self.VERSION,
+                self.STATES.index(record['state']),
+                record['pid'],
+                record['attempts'],
+                record['failures'],
+                0,
+                record['connected_at'],
+                record['latency_ms'],
+                record['rx_bytes'],
+                record['tx_bytes'],
+                self._encode(record['tun'], 16),
+                self._encode(record['server'], 64),
+            )
+
+            # Writers are serialized, an odd value means one died mid-update.
+            (seq,) = self.SEQ_FORMAT.unpack_from(self.status_map, 0)
+            seq += seq & 1
+
+            self.SEQ_FORMAT.pack_into(self.status_map, 0, seq + 1)
+            self.status_map[self.SEQ_FORMAT.size : self.SIZE] = body
+            self.SEQ_FORMAT.pack_into(self.status_map, 0, seq + 2)
+            return True
+
+        finally:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def sample(self) -> dict | None:
+        """
+        Reads a consistent copy of the record.
+
+        Return:
+
+            Dict with the FIELDS values, or None if the segment is missing,
+            uninitialized or kept busy by the writer.
+        """
+        if self.status_map is None:
+            return None
+
+        for _ in range(self.MAX_RETRIES):
+            (before,) = self.SEQ_FORMAT.unpack_from(self.status_map, 0)
+            if before & 1:
+                continue
+
+            record = self._unpack()
+
+            (after,) = self.SEQ_FORMAT.unpack_from(self.status_map, 0)
+            if before != after:
+                continue
+
+            return record
+
+        return None
+
+    def close(self) -> None:
+        """
+        Unmaps the status file.
+        """
+        if self.status_map is not None:
+            self.status_map.close()
+            self.status_map = None
+
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    @staticmethod
+    def _read_counter(tun: str, name: str) -> int:
+        """
+        Reads a traffic counter of the tun device.
+
+        Args:
+
+            tun (str): Tunnel interface e.g tun0
+
+            name (str): Counter name, rx_bytes or tx_bytes.
+        """
+        try:
+            with open(f'/sys/class/net/{tun}/statistics/{name}') as file:
+                return int(file.read())
+
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def _probe_latency(tun: str, target: str = '1.1.1.1') -> float:
+        """
+        Pings a host through the tunnel.
+
+        Args:
+
+            tun (str): Tunnel interface e.g tun0
+
+            target (str): Host to ping.
+
+        Return:
+
+            Round trip time in milliseconds, -1 if the probe was lost.
+        """
+        try:
+            result = subprocess.run(
+                ['ping', '-c', '1', '-W', '2', '-I', tun, target],
+                capture_output=True,
+                text=True,
+            )
+            match = re.search(r'time=([\d.]+)', result.stdout)
+            if match:
+                return float(match.group(1))
+
+        except Exception:
+            pass
+
+        return -1.0
+
+    def monitor(self, pid: int, interval: int = 5) -> None:
+        """
+        Refreshes latency and byte counters while the openvpn process lives,
+        then marks the connection as stopped.
+
+        Args:
+
+            pid (int): Openvpn process to follow.
+
+            interval (int): Seconds between refreshes.
+        """
+        current = self.sample() or {}
+        tun = current.get('tun') or 'tun0'
+
+        # Only latency and counters are written, and only while the published
+        # connection is still ours; execstop or a new start take precedence.
+        while os.path.exists(f'/proc/{pid}'):
+            latency = self._probe_latency(tun)
+            written = self.update(
+                if_pid=pid,
+                latency_ms=latency,
+                rx_bytes=self._read_counter(tun, 'rx_bytes'),
+                tx_bytes=self._read_counter(tun, 'tx_bytes'),
+            )
+            if not written:
+                return
+
+            time.sleep(interval)
+
+        self.update(
+            if_pid=pid,
+            state='stopped',
+            pid=0,
+            connected_at=0.0,
+            **self.IDLE_METRICS,
+        )
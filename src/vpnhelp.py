@@ -7,9 +7,13 @@ import time
 sys.path.append(os.environ['ROOT'])
 
 
+from .cipherhelp import CipherHelp
 from .filehelp import FileHelp
+from .mtuhelp import MtuHelp
 from .networkmanager import NetworkManager
 from .processhelp import ProcessHelp
+from .splithelp import SplitHelp
+from .statushelp import StatusHelp
 
 
 class VpnHelp:
@@ -25,6 +29,8 @@ class VpnHelp:
         self.vpn_dns = ['1.1.1.1\n', '8.8.4.4\n']
         self.openvpn_process = None
         self.server_pool = []
+        self.bypass_set = None
+        self.status = StatusHelp(writable=True)
 
     def start(self, auth_file: str, config_file: str) -> bool:
         """
@@ -45,7 +51,15 @@ class VpnHelp:
         self.config_file = config_file
 
         NetworkManager.disable_kill_switch()
+        self.status.update(
+            state='connecting',
+            server=os.path.basename(config_file),
+            attempts=0,
+            failures=0,
+            **StatusHelp.IDLE_METRICS,
+        )
         for attempt in range(3):
+            self.status.update(attempts=attempt + 1)
             try:
                 NetworkManager.new_mac_address()
                 # self.new_mac_address()
@@ -55,6 +69,16 @@ class VpnHelp:
                 dns_content = '\n'.join([f'nameserver {dns}' for dns in self.vpn_dns])
                 FileHelp.write('/etc/resolv.conf', dns_content)
 
+                # Route the bypass list around the tunnel before it comes up.
+                if SplitHelp.apply():
+                    self.bypass_set = SplitHelp.IPSET_NAME
+
+                # Only the first attempt narrows the ciphers, retries keep the
+                # provider's settings in case the server rejected our choice.
+                cipher_args = (
+                    CipherHelp.openvpn_args(config_file) if not attempt else []
+                )
+
                 # Start OpenVPN and wait for connection
                 self.openvpn_process = subprocess.Popen(
                     [
@@ -64,6 +88,8 @@ class VpnHelp:
                         config_file,
                         '--auth-user-pass',
                         auth_file,
+                        *MtuHelp.openvpn_args(config_file),
+                        *cipher_args,
                     ],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
@@ -74,8 +100,18 @@ class VpnHelp:
                 if NetworkManager.check_internet_connection():
                     print('VPN started successfully.')
 
-                    NetworkManager.enable_kill_switch()
+                    NetworkManager.enable_kill_switch(self.bypass_set)
+
+                    # Re-probe expired entries, the values apply on the next connect.
+                    if MtuHelp.needs_probe(config_file):
+                        MtuHelp.discover(config_file)
                     self.is_active = True
+                    self.status.update(
+                        state='connected',
+                        pid=self.openvpn_process.pid,
+                        tun='tun0',
+                        connected_at=time.time(),
+                    )
                     return self.openvpn_process
                 else:
                     self.stop()
@@ -87,10 +123,13 @@ class VpnHelp:
                 FileNotFoundError,
             ) as err:
                 print(f'Attempt {attempt + 1} failed: {err}')
+                self.status.update(failures=self.status.record['failures'] + 1)
                 self.stop()
+                self.status.update(state='connecting', **StatusHelp.IDLE_METRICS)
                 continue
 
         print('All VPN connection attempts failed.')
+        self.status.update(state='failed')
         return False
 
     def stop(self):
@@ -99,6 +138,9 @@ class VpnHelp:
         """
 
         NetworkManager.disable_kill_switch()
+        SplitHelp.remove()
+        self.bypass_set = None
+
         if self.openvpn_process:
             self.openvpn_process.terminate()
             try:
@@ -126,4 +168,7 @@ class VpnHelp:
             print(f'Error restarting services: {err}')
 
         self.is_active = False
+        self.status.update(
+            state='stopped', pid=0, connected_at=0.0, **StatusHelp.IDLE_METRICS
+        )
         print('VPN stopped.')
@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+import time
+
+
+CURRENTDIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append(CURRENTDIR)
+
+
+try:
+    from src.statushelp import STATUS_FILE, StatusHelp
+
+except ImportError as e:
+    print(f'Importation error: {e}')
+    sys.exit(1)
+
+
+def main() -> None:
+    """
+    Prints the live status segment. Pass --json for machine readable output.
+    """
+    status = StatusHelp(STATUS_FILE)
+    record = status.sample()
+    status.close()
+
+    if record is None:
+        print('No status available.')
+        sys.exit(1)
+
+    if '--json' in sys.argv[1:]:
+        print(json.dumps(record))
+        return
+
+    if record['connected_at']:
+        uptime = int(time.time() - record['connected_at'])
+        record['connected_at'] = f'{time.ctime(record["connected_at"])} ({uptime}s)'
+
+    for field, value in record.items():
+        print(f'{field:<14}{value}')
+
+
+if __name__ == '__main__':
+    main()